@@ -1,11 +1,71 @@
-from fastapi import APIRouter, UploadFile, File, HTTPException
-from fastapi.responses import JSONResponse
+import re
+from typing import Optional, Tuple
+
+from fastapi import APIRouter, UploadFile, File, HTTPException, Request
+from fastapi.concurrency import run_in_threadpool
+from fastapi.responses import JSONResponse, Response
 from src.pixtral import process_pdf
+from src.app.infra.previews import (
+    preview_cache, is_document_id, InvalidDocument, RenderError, SIZES, FORMATS, MEDIA_TYPES, RENDER_VERSION,
+)
 
 router = APIRouter(prefix="/api", tags=["api"])
 
 MAX_SIZE_BYTES = 50 * 1024 * 1024  # 50 MB
 
+# Previews are content-addressed: a URL carrying the current render version
+# (v=, as returned by the status endpoint) never changes. Without it, clients
+# must revalidate with the ETag so that new rendering settings reach them.
+PREVIEW_CACHE_CONTROL = "public, max-age=31536000, immutable"
+PREVIEW_CACHE_CONTROL_UNVERSIONED = "public, no-cache"
+RANGE_RE = re.compile(r"^bytes=(\d*)-(\d*)$")
+# PDF readers accept the header anywhere in the first 1024 bytes.
+PDF_SIGNATURE = b"%PDF-"
+
+
+def _etag_matches(if_none_match: Optional[str], etag: str) -> bool:
+    """Weak comparison of an If-None-Match header against an ETag."""
+    if not if_none_match:
+        return False
+    for candidate in if_none_match.split(","):
+        candidate = candidate.strip()
+        if candidate == "*" or candidate.removeprefix("W/") == etag:
+            return True
+    return False
+
+
+def _parse_range(range_header: str, length: int) -> Optional[Tuple[int, int]]:
+    """Return the (start, end) byte span requested by a Range header.
+
+    Returns None for forms that are not supported (multiple ranges) or not
+    valid, in which case the header is ignored and the full body is sent.
+    Raises a 416 when the range is valid but cannot be satisfied.
+    """
+    match = RANGE_RE.match(range_header.strip())
+    if match is None or match.groups() == ("", ""):
+        return None
+    first, last = match.groups()
+    if first:
+        start = int(first)
+        if last and int(last) < start:
+            return None
+        end = min(int(last), length - 1) if last else length - 1
+    else:
+        # Suffix range: the last N bytes
+        start, end = max(0, length - int(last)), length - 1
+        if int(last) == 0:
+            start = length  # "bytes=-0" asks for nothing
+    if start >= length:
+        raise HTTPException(status_code=416, detail="Range not satisfiable.",
+                            headers={"Content-Range": f"bytes */{length}"})
+    return start, end
+
+
+def _check_document(doc_id: str) -> None:
+    if not is_document_id(doc_id) or not preview_cache.has_document(doc_id):
+        raise HTTPException(status_code=404, detail="Unknown document.")
+
+
 @router.post("/send-book")
 @router.post("/send book")
 async def send_book(file: UploadFile = File(...)):
@@ -17,6 +77,13 @@ async def send_book(file: UploadFile = File(...)):
     data = await file.read()
     if len(data) > MAX_SIZE_BYTES:
         raise HTTPException(status_code=413, detail="File too large. Max 50 MB.")
+    if PDF_SIGNATURE not in data[:1024]:
+        raise HTTPException(status_code=400, detail="Unsupported file type. Please upload a PDF.")
+
+    # Store the deposit (hashing and writing off the event loop) and queue
+    # the rendering of its previews
+    doc_id = await run_in_threadpool(preview_cache.add_document, data)
+    preview_cache.schedule(doc_id)
 
     try:
         ocr = process_pdf(file.filename, data)
@@ -24,4 +91,50 @@ async def send_book(file: UploadFile = File(...)):
         # Map general errors to 500
         raise HTTPException(status_code=500, detail=f"OCR processing failed: {e}")
 
-    return JSONResponse(content=ocr)
+    return JSONResponse(content=ocr, headers={"X-Preview-Id": doc_id})
+
+
+@router.get("/previews/{doc_id}")
+def preview_status(doc_id: str):
+    # Declared sync: reading the PDF and checking every page would block the loop.
+    _check_document(doc_id)
+    try:
+        return preview_cache.status(doc_id)
+    except InvalidDocument:
+        raise HTTPException(status_code=422, detail="Document is not a readable PDF.")
+
+
+@router.get("/previews/{doc_id}/{page}")
+def get_preview(request: Request, doc_id: str, page: int, size: str = "small", fmt: str = "webp",
+                v: Optional[str] = None):
+    # Declared sync so on-demand rendering runs in the threadpool.
+    if size not in SIZES or fmt not in FORMATS:
+        raise HTTPException(status_code=400, detail="Unsupported preview size or format.")
+    _check_document(doc_id)
+
+    try:
+        path = preview_cache.get(doc_id, page, size, fmt)
+    except InvalidDocument:
+        raise HTTPException(status_code=422, detail="Document is not a readable PDF.")
+    except RenderError as e:
+        raise HTTPException(status_code=503, detail=f"Preview rendering failed: {e}")
+    if path is None:
+        raise HTTPException(status_code=404, detail="Preview not found.")
+
+    etag = f'"{doc_id}-{RENDER_VERSION}-{page}-{size}-{fmt}"'
+    cache_control = PREVIEW_CACHE_CONTROL if v == RENDER_VERSION else PREVIEW_CACHE_CONTROL_UNVERSIONED
+    headers = {"ETag": etag, "Cache-Control": cache_control, "Accept-Ranges": "bytes"}
+    if _etag_matches(request.headers.get("if-none-match"), etag):
+        return Response(status_code=304, headers=headers)
+    data = path.read_bytes()
+
+    range_header = request.headers.get("range")
+    if_range = request.headers.get("if-range")
+    if range_header and (if_range is None or if_range == etag):
+        span = _parse_range(range_header, len(data))
+        if span is not None:
+            start, end = span
+            headers["Content-Range"] = f"bytes {start}-{end}/{len(data)}"
+            return Response(data[start:end + 1], status_code=206, media_type=MEDIA_TYPES[fmt], headers=headers)
+
+    return Response(data, media_type=MEDIA_TYPES[fmt], headers=headers)
@@ -0,0 +1,402 @@
+"""Page preview and thumbnail cache for submissions pending moderation.
+
+Previews are rendered once per document with ``pdftoppm`` (as in
+``src/cli/format_small_book.py``), downscaled with Pillow and stored on disk
+under a content-addressed layout::
+
+    <cache_dir>/<doc_id[:2]>/<doc_id>/source.pdf
+    <cache_dir>/<doc_id[:2]>/<doc_id>/<RENDER_VERSION>/<size>/<page>.<fmt>
+
+where ``doc_id`` is the SHA-256 of the PDF bytes and ``RENDER_VERSION`` is
+derived from the rendering settings. Because entries never change once
+written, they can be served with long-lived HTTP caching. The cache keeps its
+total size under a byte budget by evicting the least recently used documents.
+"""
+import hashlib
+import io
+import logging
+import os
+import queue
+import re
+import shutil
+import subprocess
+import tempfile
+import threading
+from collections import OrderedDict
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Dict, Iterable, Iterator, List, Optional, Set, Tuple
+
+from PIL import Image
+from PyPDF2 import PdfReader
+from PyPDF2.errors import PdfReadError
+
+# Target widths in pixels for each preview size.
+SIZES: Dict[str, int] = {"thumb": 160, "small": 480, "large": 1200}
+FORMATS: Dict[str, str] = {"webp": "WEBP", "jpeg": "JPEG"}
+MEDIA_TYPES: Dict[str, str] = {"webp": "image/webp", "jpeg": "image/jpeg"}
+QUALITY = 80
+
+# Changes whenever the rendering settings change, so that previously cached
+# (and HTTP-cached) images are never served for the new settings.
+RENDER_VERSION = "v" + hashlib.sha256(
+    repr((sorted(SIZES.items()), sorted(FORMATS.items()), QUALITY)).encode("utf-8")
+).hexdigest()[:8]
+
+DEFAULT_CACHE_DIR = Path(__file__).resolve().parents[3] / "data" / ".previews"
+DEFAULT_MAX_BYTES = 2 * 1024 * 1024 * 1024  # 2 GB
+# Max pdftoppm processes running at once, on-demand and background together.
+RENDER_CONCURRENCY = os.cpu_count() or 2
+
+SOURCE_NAME = "source.pdf"
+TMP_SUFFIX = ".tmp"
+DOC_ID_RE = re.compile(r"^[0-9a-f]{64}$")
+
+logger = logging.getLogger(__name__)
+
+
+class InvalidDocument(Exception):
+    """Raised when a cached source cannot be read as a PDF."""
+
+
+class RenderError(Exception):
+    """Raised when a preview cannot be rendered on demand."""
+
+
+def document_id(content: bytes) -> str:
+    """Return the content address (SHA-256 hex digest) of a PDF."""
+    return hashlib.sha256(content).hexdigest()
+
+
+def is_document_id(value: str) -> bool:
+    """Tell whether a string is a well-formed document id."""
+    return DOC_ID_RE.match(value) is not None
+
+
+def _render_page(pdf_path: Path, page: int, width: int) -> Image.Image:
+    """Rasterize a single page (1-based) of a PDF to the given width."""
+    with tempfile.TemporaryDirectory() as tmp:
+        out = Path(tmp) / "page"
+        subprocess.run([
+            "pdftoppm", "-png", "-singlefile",
+            "-f", str(page), "-l", str(page),
+            "-scale-to-x", str(width), "-scale-to-y", "-1",
+            str(pdf_path), str(out)
+        ], check=True, capture_output=True)
+        with Image.open(out.with_suffix(".png")) as img:
+            return img.convert("RGB")
+
+
+class PreviewCache:
+    """Disk cache of multi-resolution page previews with an LRU size budget."""
+
+    def __init__(self, root: Path = DEFAULT_CACHE_DIR, max_bytes: int = DEFAULT_MAX_BYTES):
+        self.root = Path(root)
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+        self._in_progress: Set[str] = set()
+        self._page_counts: Dict[str, int] = {}
+        # doc_id -> bytes on disk, least recently used first. Loaded lazily.
+        self._docs: Optional["OrderedDict[str, int]"] = None
+        self._total_bytes = 0
+        self._page_locks: Dict[Tuple[str, int], Tuple[threading.Lock, int]] = {}
+        self._render_slots = threading.BoundedSemaphore(RENDER_CONCURRENCY)
+        # Background generation gets its own (daemon) thread so that long
+        # documents never hold the web server's threadpool or block exit.
+        self._queue: "queue.Queue[str]" = queue.Queue()
+        self._worker: Optional[threading.Thread] = None
+
+    # --- layout -------------------------------------------------------------
+
+    def _doc_dir(self, doc_id: str) -> Path:
+        return self.root / doc_id[:2] / doc_id
+
+    def _variant_path(self, doc_id: str, page: int, size: str, fmt: str) -> Path:
+        return self._doc_dir(doc_id) / RENDER_VERSION / size / f"{page:04d}.{fmt}"
+
+    def source_path(self, doc_id: str) -> Path:
+        return self._doc_dir(doc_id) / SOURCE_NAME
+
+    def has_document(self, doc_id: str) -> bool:
+        return self.source_path(doc_id).is_file()
+
+    def page_count(self, doc_id: str) -> int:
+        """Return the number of pages of a cached document.
+
+        Raises:
+            InvalidDocument: if the source is not a readable PDF.
+        """
+        if doc_id not in self._page_counts:
+            try:
+                count = len(PdfReader(str(self.source_path(doc_id))).pages)
+            except PdfReadError as e:
+                raise InvalidDocument(f"{doc_id} is not a readable PDF: {e}") from e
+            self._page_counts[doc_id] = count
+        return self._page_counts[doc_id]
+
+    # --- size accounting and eviction ---------------------------------------
+
+    def _load_index(self) -> "OrderedDict[str, int]":
+        """Build the in-memory LRU index from disk, once.
+
+        Must be called with the lock held. Documents are ordered by the
+        newest mtime among their files, which survives restarts.
+        """
+        if self._docs is None:
+            found: Dict[str, List[float]] = {}
+            if self.root.is_dir():
+                for p in self.root.rglob("*"):
+                    parts = p.relative_to(self.root).parts
+                    # Skip stray files and writes in flight.
+                    if len(parts) < 3 or p.name.endswith(TMP_SUFFIX) or not p.is_file():
+                        continue
+                    st = p.stat()
+                    last_used, size = found.get(parts[1], (0.0, 0))
+                    found[parts[1]] = [max(last_used, st.st_mtime), size + st.st_size]
+            self._docs = OrderedDict(
+                (doc_id, size) for doc_id, (_, size) in sorted(found.items(), key=lambda d: d[1][0])
+            )
+            self._total_bytes = sum(self._docs.values())
+        return self._docs
+
+    def _used(self, doc_id: str, added: int = 0) -> None:
+        """Mark a document as most recently used and record written bytes.
+
+        Evicts least recently used documents until 90% of the budget is free
+        when the budget is exceeded. A document is evicted as a whole (source
+        and previews) so that a cached id is either fully usable or gone.
+        """
+        victims = []
+        with self._lock:
+            docs = self._load_index()
+            if added or doc_id in docs:
+                docs[doc_id] = docs.get(doc_id, 0) + added
+                docs.move_to_end(doc_id)
+                self._total_bytes += added
+            if self._total_bytes > self.max_bytes:
+                target = int(self.max_bytes * 0.9)
+                for victim, size in list(docs.items()):
+                    if self._total_bytes <= target:
+                        break
+                    # Never evict a document being written to right now.
+                    if victim == doc_id or victim in self._in_progress:
+                        continue
+                    del docs[victim]
+                    self._page_counts.pop(victim, None)
+                    self._total_bytes -= size
+                    victims.append(victim)
+        for victim in victims:
+            doc_dir = self._doc_dir(victim)
+            shutil.rmtree(doc_dir, ignore_errors=True)
+            try:
+                doc_dir.parent.rmdir()  # prefix directory, if now empty
+            except OSError:
+                pass
+
+    @staticmethod
+    def _touch(path: Path) -> None:
+        # Persists recency on disk for the index built at next startup.
+        try:
+            os.utime(path)
+        except FileNotFoundError:
+            pass
+
+    # --- writes -------------------------------------------------------------
+
+    def _write(self, doc_id: str, path: Path, data: bytes) -> None:
+        """Atomically write a cache file and account for its size.
+
+        Each write goes through its own temporary file, so concurrent writers
+        of the same path never clash.
+        """
+        with self._lock:
+            # Index before writing, so the scan cannot count this file twice.
+            self._load_index()
+        path.parent.mkdir(parents=True, exist_ok=True)
+        fd, tmp = tempfile.mkstemp(dir=path.parent, suffix=TMP_SUFFIX)
+        try:
+            with os.fdopen(fd, "wb") as f:
+                f.write(data)
+            try:
+                previous = path.stat().st_size
+            except FileNotFoundError:
+                previous = 0
+            os.replace(tmp, path)
+        except BaseException:
+            try:
+                os.unlink(tmp)
+            except FileNotFoundError:
+                pass
+            raise
+        self._used(doc_id, len(data) - previous)
+
+    def add_document(self, content: bytes) -> str:
+        """Store a PDF in the cache and return its document id."""
+        doc_id = document_id(content)
+        source = self.source_path(doc_id)
+        if source.is_file():
+            self._touch(source)
+            self._used(doc_id)
+        else:
+            self._write(doc_id, source, content)
+        return doc_id
+
+    @contextmanager
+    def _page_lock(self, doc_id: str, page: int) -> Iterator[None]:
+        """Serialize renders of one page, so concurrent misses render it once."""
+        key = (doc_id, page)
+        with self._lock:
+            lock, users = self._page_locks.get(key, (threading.Lock(), 0))
+            self._page_locks[key] = (lock, users + 1)
+        try:
+            with lock:
+                yield
+        finally:
+            with self._lock:
+                lock, users = self._page_locks[key]
+                if users == 1:
+                    del self._page_locks[key]
+                else:
+                    self._page_locks[key] = (lock, users - 1)
+
+    def render_page(self, doc_id: str, page: int,
+                    variants: Optional[Iterable[Tuple[str, str]]] = None) -> None:
+        """Render the missing variants of one page from the cached source.
+
+        Args:
+            doc_id: Document id.
+            page: 1-based page number.
+            variants: (size, format) pairs to render; all of them by default.
+        """
+        wanted = list(variants) if variants is not None else [
+            (size, fmt) for size in SIZES for fmt in FORMATS
+        ]
+        with self._page_lock(doc_id, page):
+            # Another caller may have rendered them while we were waiting.
+            missing = [(size, fmt) for size, fmt in wanted
+                       if not self._variant_path(doc_id, page, size, fmt).is_file()]
+            if not missing:
+                return
+            source = self.source_path(doc_id)
+            self._touch(source)
+            with self._render_slots:
+                largest = _render_page(source, page, max(SIZES[size] for size, _ in missing))
+            for size, fmt in missing:
+                img = largest
+                width = SIZES[size]
+                if width < largest.width:
+                    height = max(1, round(largest.height * width / largest.width))
+                    img = largest.resize((width, height), Image.LANCZOS)
+                buf = io.BytesIO()
+                img.save(buf, FORMATS[fmt], quality=QUALITY)
+                self._write(doc_id, self._variant_path(doc_id, page, size, fmt), buf.getvalue())
+
+    def schedule(self, doc_id: str) -> None:
+        """Queue background generation of a document's previews."""
+        with self._lock:
+            if self._worker is None:
+                self._worker = threading.Thread(target=self._work, name="previews", daemon=True)
+                self._worker.start()
+        self._queue.put(doc_id)
+
+    def _work(self) -> None:
+        while True:
+            self.generate(self._queue.get())
+
+    def generate(self, doc_id: str) -> None:
+        """Render previews for all pages of a document, first pages first.
+
+        Runs in the background (see :meth:`schedule`), so failures are logged
+        rather than raised. Pages that are already cached are skipped, a page
+        that fails to render does not stop the following ones, and concurrent
+        calls for the same document are collapsed into one.
+        """
+        with self._lock:
+            if doc_id in self._in_progress:
+                return
+            self._in_progress.add(doc_id)
+        try:
+            try:
+                pages = self.page_count(doc_id)
+            except (OSError, InvalidDocument):
+                logger.exception("Cannot generate previews for %s", doc_id)
+                return
+            for page in range(1, pages + 1):
+                try:
+                    self.render_page(doc_id, page)
+                except FileNotFoundError:
+                    # pdftoppm or the source is missing: later pages would
+                    # fail the same way.
+                    logger.exception("Preview generation aborted for %s", doc_id)
+                    return
+                except (OSError, subprocess.CalledProcessError):
+                    # The page can still be rendered on demand.
+                    logger.exception("Preview of page %d failed for %s", page, doc_id)
+        finally:
+            with self._lock:
+                self._in_progress.discard(doc_id)
+
+    # --- reads --------------------------------------------------------------
+
+    def get(self, doc_id: str, page: int, size: str, fmt: str) -> Optional[Path]:
+        """Return the path of a preview, rendering it on demand if missing.
+
+        Only the requested variant is rendered; the background job fills in
+        the others. Returns None when the document is unknown or the page is
+        out of range.
+
+        Raises:
+            InvalidDocument: if the source is not a readable PDF.
+            RenderError: if the preview could not be rendered.
+        """
+        path = self._variant_path(doc_id, page, size, fmt)
+        if path.is_file():
+            self._touch(path)
+            self._used(doc_id)
+            return path
+        try:
+            if not self.has_document(doc_id) or not 1 <= page <= self.page_count(doc_id):
+                return None
+        except FileNotFoundError:
+            return None  # evicted in the meantime
+        try:
+            self.render_page(doc_id, page, [(size, fmt)])
+        except (OSError, subprocess.CalledProcessError) as e:
+            raise RenderError(f"Cannot render page {page} of {doc_id}: {e}") from e
+        return path if path.is_file() else None
+
+    def status(self, doc_id: str) -> Dict[str, object]:
+        """Describe a cached document and how many pages are ready.
+
+        Raises:
+            InvalidDocument: if the source is not a readable PDF.
+        """
+        pages = self.page_count(doc_id)
+        ready = sum(
+            1 for page in range(1, pages + 1)
+            if self._variant_path(doc_id, page, "thumb", "webp").is_file()
+        )
+        return {
+            "id": doc_id,
+            "pages": pages,
+            "ready": ready,
+            "generating": doc_id in self._in_progress,
+            "version": RENDER_VERSION,
+            "sizes": SIZES,
+            "formats": list(FORMATS),
+        }
+
+
+def _cache_from_env() -> PreviewCache:
+    root = Path(os.environ.get("PREVIEW_CACHE_DIR", DEFAULT_CACHE_DIR))
+    max_bytes = int(os.environ.get("PREVIEW_CACHE_MAX_BYTES", DEFAULT_MAX_BYTES))
+    return PreviewCache(root, max_bytes)
+
+
+preview_cache = _cache_from_env()
+
+
+__all__ = [
+    "PreviewCache", "InvalidDocument", "RenderError", "preview_cache", "document_id", "is_document_id",
+    "SIZES", "FORMATS", "MEDIA_TYPES", "RENDER_VERSION",
+]
@@ -12,6 +12,7 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["X-Preview-Id", "ETag", "Content-Range"],
 )
 
 # Simple health endpoint
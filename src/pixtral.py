@@ -11,7 +11,10 @@ def _load_api_key() -> str:
     """Loads the Pixtral/Mistral API key from apikey.json located in src/ directory.
 
     Searches relative to this file's directory to be robust to working directory.
+    The PIXTRAL_API_KEY environment variable, when set, takes precedence.
     """
+    if os.environ.get("PIXTRAL_API_KEY"):
+        return os.environ["PIXTRAL_API_KEY"]
     here = os.path.dirname(__file__)
     path = os.path.join(here, "apikey.json")
     with open(path, "r", encoding="utf-8") as f:
@@ -19,8 +22,15 @@ def _load_api_key() -> str:
 
 
 def get_client() -> Mistral:
-    """Create and return a Mistral client using the configured API key."""
+    """Create and return a Mistral client using the configured API key.
+
+    Set PIXTRAL_SERVER_URL to point the client at another backend, such as the
+    local OCR stand-in used by the load tests (tests/load/fake_ocr.py).
+    """
     api_key = _load_api_key()
+    server_url = os.environ.get("PIXTRAL_SERVER_URL")
+    if server_url:
+        return Mistral(api_key=api_key, server_url=server_url)
     return Mistral(api_key=api_key)
 
 
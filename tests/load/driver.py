@@ -0,0 +1,251 @@
+"""Load-test driver for ``/api/send-book``.
+
+Starts the fake OCR server and the instrumented app (unless ``--target`` is
+given), then replays a weighted mix of PDF sizes at each concurrency level and
+reports throughput, latency percentiles, server RSS and event-loop lag::
+
+    python -m tests.load.driver --mix 1:6,20:3,300:1 --concurrency 1,4,16 --requests 100
+
+No Mistral credentials are used: the app is pointed at the fake server
+through ``PIXTRAL_SERVER_URL``.
+"""
+import argparse
+import asyncio
+import io
+import json
+import os
+import random
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+import uuid
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+
+import httpx
+from PyPDF2 import PdfWriter
+
+ROOT = Path(__file__).resolve().parents[2]
+
+
+def make_pdf(pages: int, nonce: Optional[str] = None) -> bytes:
+    """Build an in-memory PDF with the given number of blank A4 pages.
+
+    A nonce stored in the document info makes the bytes unique, so the
+    content-addressed preview cache treats each upload as a new deposit.
+    """
+    writer = PdfWriter()
+    for _ in range(pages):
+        writer.add_blank_page(width=595, height=842)
+    if nonce:
+        writer.add_metadata({"/LoadTestNonce": nonce})
+    buf = io.BytesIO()
+    writer.write(buf)
+    return buf.getvalue()
+
+
+def parse_mix(mix: str) -> List[Tuple[int, int]]:
+    """Parse ``"pages:weight,..."`` into a list of (pages, weight)."""
+    result = []
+    for item in mix.split(","):
+        pages, _, weight = item.partition(":")
+        result.append((int(pages), int(weight or 1)))
+    return result
+
+
+def percentile(values: List[float], q: float) -> float:
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * q))]
+
+
+def _free_port() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def _wait_ready(url: str, timeout: float = 30.0) -> None:
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        try:
+            httpx.get(url, timeout=1.0)
+            return
+        except httpx.HTTPError:
+            time.sleep(0.2)
+    raise RuntimeError(f"Server not ready: {url}")
+
+
+@contextmanager
+def local_servers(args):
+    """Run the fake OCR server and the instrumented app as subprocesses."""
+    ocr_port, app_port = _free_port(), _free_port()
+    ocr_cmd = [
+        sys.executable, "-m", "tests.load.fake_ocr", "--port", str(ocr_port),
+        "--latency", str(args.latency), "--per-page-latency", str(args.per_page_latency),
+        "--error-rate", str(args.error_rate), "--rate-limit", str(args.rate_limit),
+        "--image-bytes", str(args.image_bytes),
+    ]
+    with tempfile.TemporaryDirectory() as cache_dir:
+        env = dict(os.environ,
+                   PIXTRAL_SERVER_URL=f"http://127.0.0.1:{ocr_port}",
+                   PIXTRAL_API_KEY="loadtest",
+                   PREVIEW_CACHE_DIR=cache_dir)
+        app_cmd = [
+            sys.executable, "-m", "uvicorn", "tests.load.instrumented_app:app",
+            "--port", str(app_port), "--log-level", "warning",
+        ]
+        procs = [subprocess.Popen(ocr_cmd, cwd=ROOT),
+                 subprocess.Popen(app_cmd, cwd=ROOT, env=env)]
+        try:
+            _wait_ready(f"http://127.0.0.1:{ocr_port}/docs")
+            _wait_ready(f"http://127.0.0.1:{app_port}/health")
+            yield f"http://127.0.0.1:{app_port}"
+        finally:
+            for proc in procs:
+                proc.terminate()
+            for proc in procs:
+                proc.wait()
+
+
+def prepare_uploads(weights: List[Tuple[int, int]], total: int, reuse: bool) -> List[Tuple[int, bytes]]:
+    """Draw ``total`` PDF sizes from the mix and build their bytes up front.
+
+    Unless ``reuse`` is set, every upload is a distinct document, as real
+    deposits are; reused bytes only exercise the preview cache-hit path.
+    """
+    sizes = random.choices([p for p, _ in weights], [w for _, w in weights], k=total)
+    if reuse:
+        shared = {pages: make_pdf(pages) for pages in set(sizes)}
+        return [(pages, shared[pages]) for pages in sizes]
+    return [(pages, make_pdf(pages, uuid.uuid4().hex)) for pages in sizes]
+
+
+async def run_level(client: httpx.AsyncClient, target: str, uploads: List[Tuple[int, bytes]],
+                    concurrency: int) -> Dict[str, object]:
+    """Send every upload with at most ``concurrency`` in flight."""
+    total = len(uploads)
+    queue: asyncio.Queue = asyncio.Queue()
+    for upload in uploads:
+        queue.put_nowait(upload)
+    latencies: List[float] = []
+    statuses: Dict[str, int] = {}
+
+    async def worker():
+        while not queue.empty():
+            pages, pdf = queue.get_nowait()
+            started = time.perf_counter()
+            try:
+                response = await client.post(
+                    f"{target}/api/send-book",
+                    files={"file": (f"book_{pages}p.pdf", pdf, "application/pdf")},
+                )
+                status = str(response.status_code)
+            except httpx.HTTPError as e:
+                status = type(e).__name__
+            elapsed = time.perf_counter() - started
+            statuses[status] = statuses.get(status, 0) + 1
+            if status == "200":
+                latencies.append(elapsed)
+
+    started = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    duration = time.perf_counter() - started
+    return {
+        "concurrency": concurrency,
+        "requests": total,
+        "duration_s": duration,
+        "throughput_rps": len(latencies) / duration if duration else 0.0,
+        "p50_ms": 1000 * percentile(latencies, 0.50),
+        "p95_ms": 1000 * percentile(latencies, 0.95),
+        "p99_ms": 1000 * percentile(latencies, 0.99),
+        "statuses": statuses,
+    }
+
+
+async def server_metrics(client: httpx.AsyncClient, target: str, reset: bool = False) -> Optional[Dict]:
+    try:
+        response = await client.get(f"{target}/_loadtest/{'reset' if reset else 'metrics'}")
+        return response.json() if response.status_code == 200 else None
+    except (httpx.HTTPError, ValueError):
+        return None
+
+
+async def run(args, target: str) -> List[Dict[str, object]]:
+    weights = parse_mix(args.mix)
+    results = []
+    async with httpx.AsyncClient(timeout=args.timeout) as client:
+        for concurrency in args.concurrency:
+            uploads = prepare_uploads(weights, args.requests, args.reuse_pdfs)
+            await server_metrics(client, target, reset=True)
+            result = await run_level(client, target, uploads, concurrency)
+            metrics = await server_metrics(client, target)
+            if metrics:
+                for key in ("rss", "peak_rss", "process_peak_rss"):
+                    if metrics[f"{key}_bytes"] is not None:
+                        result[f"{key}_mb"] = metrics[f"{key}_bytes"] / 2 ** 20
+                result["loop_lag_p99_ms"] = metrics["event_loop_lag"]["p99_ms"]
+                result["loop_lag_max_ms"] = metrics["event_loop_lag"]["max_ms"]
+            results.append(result)
+            print_result(result)
+    return results
+
+
+def print_result(result: Dict[str, object]) -> None:
+    line = (f"c={result['concurrency']:<4} {result['throughput_rps']:7.2f} req/s  "
+            f"p50={result['p50_ms']:8.1f}ms p95={result['p95_ms']:8.1f}ms p99={result['p99_ms']:8.1f}ms")
+    if "rss_mb" in result:
+        line += f"  rss={result['rss_mb']:.0f}MB"
+    if "peak_rss_mb" in result:
+        line += f"  pic rss={result['peak_rss_mb']:.0f}MB"
+    if "process_peak_rss_mb" in result:
+        line += f"  pic rss cumulé={result['process_peak_rss_mb']:.0f}MB"
+    if "loop_lag_p99_ms" in result:
+        line += f"  lag p99={result['loop_lag_p99_ms']:.1f}ms max={result['loop_lag_max_ms']:.1f}ms"
+    line += f"  statuts={result['statuses']}"
+    print(line, flush=True)
+
+
+def parse_arguments():
+    parser = argparse.ArgumentParser(description="Test de charge de /api/send-book")
+    parser.add_argument("--target", default=None,
+                        help="URL d'une application déjà démarrée (sinon serveurs locaux)")
+    parser.add_argument("--mix", default="1:6,20:3,300:1",
+                        help="Mélange pages:poids des PDF envoyés (défaut: 1:6,20:3,300:1)")
+    parser.add_argument("--concurrency", default="1,4,16",
+                        type=lambda s: [int(c) for c in s.split(",")],
+                        help="Niveaux de concurrence, séparés par des virgules")
+    parser.add_argument("--requests", type=int, default=50, help="Requêtes par niveau")
+    parser.add_argument("--timeout", type=float, default=120.0, help="Timeout par requête (s)")
+    parser.add_argument("--seed", type=int, default=0, help="Graine du tirage des tailles")
+    parser.add_argument("--reuse-pdfs", action="store_true",
+                        help="Renvoie les mêmes octets par taille (aperçus déjà en cache)")
+    parser.add_argument("--json", type=Path, default=None, help="Écrit les résultats dans ce fichier")
+    # Paramètres du serveur OCR factice
+    parser.add_argument("--latency", type=float, default=0.2, help="Latence OCR de base (s)")
+    parser.add_argument("--per-page-latency", type=float, default=0.01, help="Latence OCR par page (s)")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="Proportion d'erreurs OCR (0-1)")
+    parser.add_argument("--rate-limit", type=float, default=0.0, help="Requêtes/s max côté OCR (0 = illimité)")
+    parser.add_argument("--image-bytes", type=int, default=100_000,
+                        help="Taille de l'image base64 renvoyée par page par l'OCR (octets)")
+    return parser.parse_args()
+
+
+def main():
+    args = parse_arguments()
+    random.seed(args.seed)
+    if args.target:
+        results = asyncio.run(run(args, args.target.rstrip("/")))
+    else:
+        with local_servers(args) as target:
+            results = asyncio.run(run(args, target))
+    if args.json:
+        args.json.write_text(json.dumps(results, indent=2), encoding="utf-8")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,172 @@
+"""Local stand-in for the Mistral files and OCR endpoints.
+
+Implements just enough of the API used by ``src/pixtral.py`` (file upload,
+signed URL, OCR) for load tests, with configurable latency, error rate and
+rate limiting. Point the app at it with ``PIXTRAL_SERVER_URL``::
+
+    python -m tests.load.fake_ocr --port 8900 --latency 0.5 --error-rate 0.02
+"""
+import argparse
+import asyncio
+import base64
+import io
+import os
+import random
+import threading
+import time
+import uuid
+from typing import Dict, Optional
+
+from fastapi import FastAPI, File, Form, HTTPException, Request, UploadFile
+from fastapi.responses import JSONResponse
+from PyPDF2 import PdfReader
+
+
+class TokenBucket:
+    """Simple token bucket: ``rate`` requests per second, bursts up to ``burst``."""
+
+    def __init__(self, rate: float, burst: Optional[int] = None):
+        self.rate = rate
+        self.capacity = float(burst or max(1, int(rate)))
+        self.tokens = self.capacity
+        self.updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def take(self) -> bool:
+        with self._lock:
+            now = time.monotonic()
+            self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+            self.updated = now
+            if self.tokens >= 1:
+                self.tokens -= 1
+                return True
+            return False
+
+
+def _page_count(content: bytes) -> int:
+    try:
+        return len(PdfReader(io.BytesIO(content)).pages)
+    except Exception:
+        return 1
+
+
+def create_app(latency: float = 0.2, per_page_latency: float = 0.01, jitter: float = 0.1,
+               error_rate: float = 0.0, rate_limit: float = 0.0, burst: Optional[int] = None,
+               image_bytes: int = 100_000) -> FastAPI:
+    """Build the fake OCR server.
+
+    Args:
+        latency: Base OCR latency in seconds.
+        per_page_latency: Extra OCR latency per PDF page in seconds.
+        jitter: Relative random variation applied to every latency (0.1 = ±10%).
+        error_rate: Probability that an OCR call fails with a 500.
+        rate_limit: Max requests per second across all endpoints (0 disables).
+        burst: Token bucket size for the rate limit (defaults to the rate).
+        image_bytes: Size of the synthetic image returned per page when the
+            client asks for ``include_image_base64`` (before base64 encoding).
+    """
+    app = FastAPI(title="fake OCR")
+    bucket = TokenBucket(rate_limit, burst) if rate_limit > 0 else None
+    # Only page counts are kept, so memory stays flat during long runs.
+    pages: Dict[str, int] = {}
+    # Random bytes do not compress, like real JPEG data; encoded once and
+    # shared by every page so the fake itself stays cheap.
+    image_base64 = "data:image/jpeg;base64," + base64.b64encode(os.urandom(image_bytes)).decode("ascii")
+
+    async def delay(seconds: float) -> None:
+        if seconds > 0:
+            await asyncio.sleep(seconds * random.uniform(1 - jitter, 1 + jitter))
+
+    @app.middleware("http")
+    async def rate_limiter(request: Request, call_next):
+        if bucket is not None and not bucket.take():
+            return JSONResponse(status_code=429, content={"message": "Requests rate limit exceeded"})
+        return await call_next(request)
+
+    @app.post("/v1/files")
+    async def upload(file: UploadFile = File(...), purpose: str = Form("ocr")):
+        content = await file.read()
+        file_id = str(uuid.uuid4())
+        pages[file_id] = _page_count(content)
+        await delay(latency / 10)
+        return {
+            "id": file_id,
+            "object": "file",
+            "bytes": len(content),
+            "created_at": int(time.time()),
+            "filename": file.filename or "uploaded_file.pdf",
+            "purpose": purpose,
+            "sample_type": "ocr_input",
+            "source": "upload",
+        }
+
+    @app.get("/v1/files/{file_id}/url")
+    async def signed_url(file_id: str, request: Request):
+        if file_id not in pages:
+            raise HTTPException(status_code=404, detail="File not found")
+        return {"url": f"{request.base_url}v1/files/{file_id}/content"}
+
+    @app.post("/v1/ocr")
+    async def ocr(request: Request):
+        body = await request.json()
+        url = body.get("document", {}).get("document_url", "")
+        file_id = url.rstrip("/").split("/")[-2] if url.endswith("/content") else ""
+        count = pages.pop(file_id, None)
+        if count is None:
+            raise HTTPException(status_code=404, detail="Document not found")
+        await delay(latency + per_page_latency * count)
+        if random.random() < error_rate:
+            raise HTTPException(status_code=500, detail="Injected OCR failure")
+        with_images = bool(body.get("include_image_base64"))
+        return {
+            "pages": [
+                {
+                    "index": i,
+                    "markdown": f"# Page {i + 1}\n\nLorem ipsum dolor sit amet.",
+                    "images": [
+                        {
+                            "id": f"img-{i}.jpeg",
+                            "top_left_x": 0,
+                            "top_left_y": 0,
+                            "bottom_right_x": 1700,
+                            "bottom_right_y": 2200,
+                            "image_base64": image_base64,
+                        }
+                    ] if with_images else [],
+                    "dimensions": {"dpi": 200, "height": 2200, "width": 1700},
+                }
+                for i in range(count)
+            ],
+            "model": body.get("model", "mistral-ocr-latest"),
+            "usage_info": {"pages_processed": count, "doc_size_bytes": None},
+        }
+
+    return app
+
+
+def parse_arguments():
+    parser = argparse.ArgumentParser(description="Serveur OCR factice pour les tests de charge")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8900)
+    parser.add_argument("--latency", type=float, default=0.2, help="Latence OCR de base (s)")
+    parser.add_argument("--per-page-latency", type=float, default=0.01, help="Latence OCR par page (s)")
+    parser.add_argument("--jitter", type=float, default=0.1, help="Variation relative des latences")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="Proportion d'erreurs 500 (0-1)")
+    parser.add_argument("--rate-limit", type=float, default=0.0, help="Requêtes/s max (0 = illimité)")
+    parser.add_argument("--image-bytes", type=int, default=100_000,
+                        help="Taille de l'image renvoyée par page avec include_image_base64 (octets)")
+    parser.add_argument("--burst", type=int, default=None, help="Rafale max pour la limite de débit")
+    return parser.parse_args()
+
+
+def main():
+    import uvicorn
+
+    args = parse_arguments()
+    app = create_app(args.latency, args.per_page_latency, args.jitter,
+                     args.error_rate, args.rate_limit, args.burst, args.image_bytes)
+    uvicorn.run(app, host=args.host, port=args.port, log_level="warning")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,122 @@
+"""The FastAPI app wrapped with server-side metrics for load tests.
+
+Serve with ``uvicorn tests.load.instrumented_app:app``. Requests to
+``/_loadtest/metrics`` return event-loop lag and memory figures, and
+``/_loadtest/reset`` starts a new measurement window between concurrency
+levels (only the process-wide RSS high-water mark is cumulative). Every other
+request is passed through to ``src.app.main.app`` unchanged.
+"""
+import asyncio
+import json
+import resource
+import sys
+import time
+from typing import Dict, List, Optional
+
+from src.app.main import app as wrapped_app
+
+LAG_INTERVAL = 0.05  # seconds between event-loop probes
+
+
+def _current_rss() -> Optional[int]:
+    """Current resident set size, or None where /proc is not available."""
+    try:
+        with open("/proc/self/status", encoding="ascii") as f:
+            for line in f:
+                if line.startswith("VmRSS:"):
+                    return int(line.split()[1]) * 1024
+    except OSError:
+        pass
+    return None
+
+
+def _process_peak_rss() -> int:
+    """Peak resident set size over the whole life of the process."""
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # ru_maxrss is in bytes on macOS and in kilobytes elsewhere.
+    return peak if sys.platform == "darwin" else peak * 1024
+
+
+class ServerMonitor:
+    """Samples event-loop lag, and RSS where available, at a fixed interval.
+
+    Lag is how late a periodic sleep wakes up on the event loop. The RSS
+    peak is the highest sample since the last :meth:`reset`, so it can be
+    attributed to a single concurrency level.
+    """
+
+    def __init__(self, interval: float = LAG_INTERVAL):
+        self.interval = interval
+        self.samples: List[float] = []
+        self.peak_rss: Optional[int] = None
+        self._task: Optional[asyncio.Task] = None
+
+    def start(self) -> None:
+        if self._task is None:
+            self._task = asyncio.get_running_loop().create_task(self._run())
+
+    async def _run(self) -> None:
+        while True:
+            started = time.perf_counter()
+            await asyncio.sleep(self.interval)
+            self.samples.append(max(0.0, time.perf_counter() - started - self.interval))
+            rss = _current_rss()
+            if rss is not None and (self.peak_rss is None or rss > self.peak_rss):
+                self.peak_rss = rss
+
+    def reset(self) -> None:
+        self.samples = []
+        self.peak_rss = _current_rss()
+
+    def lag_summary(self) -> Dict[str, float]:
+        lags = sorted(self.samples)
+        if not lags:
+            return {"samples": 0, "mean_ms": 0.0, "p99_ms": 0.0, "max_ms": 0.0}
+        return {
+            "samples": len(lags),
+            "mean_ms": 1000 * sum(lags) / len(lags),
+            "p99_ms": 1000 * lags[min(len(lags) - 1, int(len(lags) * 0.99))],
+            "max_ms": 1000 * lags[-1],
+        }
+
+    def metrics(self) -> Dict[str, object]:
+        return {
+            "event_loop_lag": self.lag_summary(),
+            "rss_bytes": _current_rss(),
+            # Since the last reset; None where RSS cannot be sampled.
+            "peak_rss_bytes": self.peak_rss,
+            # Cumulative over the process life, all levels included.
+            "process_peak_rss_bytes": _process_peak_rss(),
+        }
+
+
+class InstrumentedApp:
+    """ASGI wrapper adding the ``/_loadtest`` endpoints around an app."""
+
+    def __init__(self, inner):
+        self.inner = inner
+        self.monitor = ServerMonitor()
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] == "http":
+            self.monitor.start()
+            if scope["path"] == "/_loadtest/metrics":
+                return await self._json(send, self.monitor.metrics())
+            if scope["path"] == "/_loadtest/reset":
+                self.monitor.reset()
+                return await self._json(send, {"status": "ok"})
+        await self.inner(scope, receive, send)
+
+    @staticmethod
+    async def _json(send, payload) -> None:
+        body = json.dumps(payload).encode("utf-8")
+        await send({
+            "type": "http.response.start",
+            "status": 200,
+            "headers": [(b"content-type", b"application/json"),
+                        (b"content-length", str(len(body)).encode("ascii"))],
+        })
+        await send({"type": "http.response.body", "body": body})
+
+
+app = InstrumentedApp(wrapped_app)
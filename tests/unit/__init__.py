@@ -1 +1 @@
-$explain
+"""Unit tests for la_response_d."""
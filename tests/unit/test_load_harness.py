@@ -0,0 +1,64 @@
+import socket
+import threading
+import time
+
+import pytest
+import uvicorn
+
+from src.pixtral import process_pdf
+from tests.load.driver import make_pdf, parse_mix, percentile
+from tests.load.fake_ocr import TokenBucket, create_app
+
+
+@pytest.fixture
+def fake_ocr_url(monkeypatch):
+    """Serve the fake OCR app on a free port and point pixtral at it."""
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        port = s.getsockname()[1]
+    app = create_app(latency=0, per_page_latency=0, image_bytes=1000)
+    server = uvicorn.Server(uvicorn.Config(app, host="127.0.0.1", port=port, log_level="warning"))
+    thread = threading.Thread(target=server.run, daemon=True)
+    thread.start()
+    deadline = time.monotonic() + 10
+    while not server.started and time.monotonic() < deadline:
+        time.sleep(0.05)
+    url = f"http://127.0.0.1:{port}"
+    monkeypatch.setenv("PIXTRAL_SERVER_URL", url)
+    monkeypatch.setenv("PIXTRAL_API_KEY", "test")
+    yield url
+    server.should_exit = True
+    thread.join(5)
+
+
+def test_process_pdf_against_fake_backend(fake_ocr_url):
+    ocr = process_pdf("book.pdf", make_pdf(3))
+    assert [page["index"] for page in ocr["pages"]] == [0, 1, 2]
+    assert ocr["usage_info"]["pages_processed"] == 3
+    image = ocr["pages"][0]["images"][0]
+    assert image["image_base64"].startswith("data:image/jpeg;base64,")
+
+
+def test_process_pdf_without_images(fake_ocr_url):
+    ocr = process_pdf("book.pdf", make_pdf(1), include_image_base64=False)
+    assert ocr["pages"][0]["images"] == []
+
+
+def test_token_bucket():
+    bucket = TokenBucket(rate=0.001, burst=2)
+    assert bucket.take()
+    assert bucket.take()
+    assert not bucket.take()
+    bucket.updated -= 1000  # 1000 s at 0.001 token/s refills one token
+    assert bucket.take()
+
+
+def test_parse_mix():
+    assert parse_mix("1:6,20:3,300") == [(1, 6), (20, 3), (300, 1)]
+
+
+def test_percentile():
+    values = [float(v) for v in range(1, 101)]
+    assert percentile(values, 0.50) == 51.0
+    assert percentile(values, 0.99) == 100.0
+    assert percentile([], 0.95) == 0.0
@@ -0,0 +1,187 @@
+import io
+import os
+import threading
+import time
+
+import pytest
+from PIL import Image
+from PyPDF2 import PdfWriter
+
+from src.app.infra import previews
+from src.app.infra.previews import PreviewCache, InvalidDocument, RenderError, SIZES, FORMATS
+
+
+def make_pdf(pages: int = 1, title: str = "") -> bytes:
+    writer = PdfWriter()
+    for _ in range(pages):
+        writer.add_blank_page(width=595, height=842)
+    if title:
+        writer.add_metadata({"/Title": title})
+    buf = io.BytesIO()
+    writer.write(buf)
+    return buf.getvalue()
+
+
+@pytest.fixture
+def renders(monkeypatch):
+    """Replace pdftoppm with a stub and record the pages it was asked for."""
+    calls = []
+
+    def fake_render(pdf_path, page, width):
+        calls.append(page)
+        return Image.new("RGB", (width, width * 4 // 3), "white")
+
+    monkeypatch.setattr(previews, "_render_page", fake_render)
+    return calls
+
+
+def test_generate_renders_every_size_and_format(tmp_path, renders):
+    cache = PreviewCache(tmp_path)
+    doc_id = cache.add_document(make_pdf(3))
+    cache.generate(doc_id)
+    assert renders == [1, 2, 3]
+    for size in SIZES:
+        for fmt in FORMATS:
+            assert cache.get(doc_id, 2, size, fmt).is_file()
+    assert cache.status(doc_id)["ready"] == 3
+
+
+def test_generate_skips_cached_pages(tmp_path, renders):
+    cache = PreviewCache(tmp_path)
+    doc_id = cache.add_document(make_pdf(2))
+    cache.render_page(doc_id, 1)
+    cache.generate(doc_id)
+    assert renders == [1, 2]
+
+
+def test_get_renders_only_the_requested_variant(tmp_path, renders):
+    cache = PreviewCache(tmp_path)
+    doc_id = cache.add_document(make_pdf(1))
+    assert cache.get(doc_id, 1, "thumb", "jpeg").is_file()
+    assert not cache._variant_path(doc_id, 1, "large", "webp").exists()
+    cache.generate(doc_id)  # fills in the other variants
+    assert renders == [1, 1]
+    assert cache.status(doc_id)["ready"] == 1
+
+
+def test_concurrent_misses_render_once(tmp_path, monkeypatch):
+    started, release = threading.Event(), threading.Event()
+    calls = []
+
+    def slow_render(pdf_path, page, width):
+        calls.append(page)
+        started.set()
+        release.wait(5)
+        return Image.new("RGB", (width, width), "white")
+
+    monkeypatch.setattr(previews, "_render_page", slow_render)
+    cache = PreviewCache(tmp_path)
+    doc_id = cache.add_document(make_pdf(1))
+    results = []
+    workers = [threading.Thread(target=lambda: results.append(cache.get(doc_id, 1, "thumb", "webp")))
+               for _ in range(4)]
+    for worker in workers:
+        worker.start()
+    assert started.wait(5)
+    release.set()
+    for worker in workers:
+        worker.join(5)
+    assert calls == [1]
+    assert len(results) == 4 and all(path.is_file() for path in results)
+
+
+def test_render_failure_raises_render_error(tmp_path, monkeypatch):
+    def missing_pdftoppm(pdf_path, page, width):
+        raise FileNotFoundError("pdftoppm")
+
+    monkeypatch.setattr(previews, "_render_page", missing_pdftoppm)
+    cache = PreviewCache(tmp_path)
+    doc_id = cache.add_document(make_pdf(1))
+    with pytest.raises(RenderError):
+        cache.get(doc_id, 1, "thumb", "webp")
+
+
+def test_generate_continues_after_failing_page(tmp_path, monkeypatch):
+    rendered = []
+
+    def flaky_render(pdf_path, page, width):
+        if page == 1:
+            raise OSError("broken page")
+        rendered.append(page)
+        return Image.new("RGB", (width, width), "white")
+
+    monkeypatch.setattr(previews, "_render_page", flaky_render)
+    cache = PreviewCache(tmp_path)
+    doc_id = cache.add_document(make_pdf(3))
+    cache.generate(doc_id)
+    assert rendered == [2, 3]
+
+
+def test_concurrent_generate_calls_are_collapsed(tmp_path, monkeypatch):
+    started, release = threading.Event(), threading.Event()
+    calls = []
+
+    def slow_render(pdf_path, page, width):
+        calls.append(page)
+        started.set()
+        release.wait(5)
+        return Image.new("RGB", (width, width), "white")
+
+    monkeypatch.setattr(previews, "_render_page", slow_render)
+    cache = PreviewCache(tmp_path)
+    doc_id = cache.add_document(make_pdf(1))
+    worker = threading.Thread(target=cache.generate, args=(doc_id,))
+    worker.start()
+    assert started.wait(5)
+    cache.generate(doc_id)  # returns at once: already in progress
+    release.set()
+    worker.join(5)
+    assert calls == [1]
+
+
+def test_invalid_source_is_reported(tmp_path, renders):
+    cache = PreviewCache(tmp_path)
+    doc_id = cache.add_document(b"not a pdf")
+    cache.generate(doc_id)  # logged, not raised
+    with pytest.raises(InvalidDocument):
+        cache.get(doc_id, 1, "thumb", "webp")
+    assert renders == []
+
+
+def test_rewrite_does_not_inflate_total(tmp_path, renders):
+    cache = PreviewCache(tmp_path)
+    doc_id = cache.add_document(make_pdf(1))
+    cache.render_page(doc_id, 1)
+    total = cache._total_bytes
+    cache.render_page(doc_id, 1)
+    assert cache._total_bytes == total
+    assert not list(tmp_path.rglob("*.tmp"))
+
+
+def test_lru_eviction_removes_whole_documents(tmp_path, renders):
+    first, second, third = (make_pdf(1, title) for title in "abc")
+    cache = PreviewCache(tmp_path, max_bytes=len(first) * 2 + len(first) // 2)
+    a = cache.add_document(first)
+    b = cache.add_document(second)
+    cache.add_document(first)  # "a" becomes the most recently used document
+    c = cache.add_document(third)
+    assert cache.has_document(a)
+    assert not cache.has_document(b)
+    assert not (tmp_path / b[:2] / b).exists()
+    assert cache.has_document(c)
+    assert cache._total_bytes <= cache.max_bytes
+
+
+def test_index_is_rebuilt_from_disk(tmp_path, renders):
+    first, second = make_pdf(1, "a"), make_pdf(1, "b")
+    cache = PreviewCache(tmp_path)
+    a = cache.add_document(first)
+    b = cache.add_document(second)
+    past = time.time() - 60
+    os.utime(cache.source_path(a), (past, past))
+    # A fresh cache (e.g. after a restart) orders documents by mtime.
+    restarted = PreviewCache(tmp_path, max_bytes=len(second) * 2 + len(second) // 2)
+    c = restarted.add_document(make_pdf(1, "c"))
+    assert not restarted.has_document(a)
+    assert restarted.has_document(b)
+    assert restarted.has_document(c)
@@ -0,0 +1,119 @@
+import pytest
+from fastapi.testclient import TestClient
+from PIL import Image
+
+from src.app import api
+from src.app.infra import previews
+from src.app.infra.previews import PreviewCache
+from src.app.main import app
+from tests.unit.test_previews import make_pdf
+
+
+@pytest.fixture
+def cache(tmp_path, monkeypatch):
+    monkeypatch.setattr(previews, "_render_page",
+                        lambda pdf_path, page, width: Image.new("RGB", (width, width), "white"))
+    cache = PreviewCache(tmp_path)
+    monkeypatch.setattr(api, "preview_cache", cache)
+    return cache
+
+
+@pytest.fixture
+def client():
+    return TestClient(app)
+
+
+@pytest.fixture
+def doc_id(cache):
+    return cache.add_document(make_pdf(2))
+
+
+def url(doc_id, page=1):
+    return f"/api/previews/{doc_id}/{page}?size=thumb&fmt=jpeg"
+
+
+def test_status(client, doc_id):
+    response = client.get(f"/api/previews/{doc_id}")
+    assert response.status_code == 200
+    assert response.json()["pages"] == 2
+
+
+def test_unknown_or_malformed_ids_are_404(client, doc_id):
+    assert client.get("/api/previews/nonexistent").status_code == 404
+    assert client.get("/api/previews/" + "0" * 64).status_code == 404
+    response = client.get(url("nonexistent"), headers={"If-None-Match": "*"})
+    assert response.status_code == 404
+    assert client.get(url(doc_id, 3)).status_code == 404
+
+
+def test_unreadable_document_is_422(client, cache):
+    bad = cache.add_document(b"not a pdf")
+    assert client.get(f"/api/previews/{bad}").status_code == 422
+    assert client.get(url(bad)).status_code == 422
+
+
+def test_send_book_rejects_non_pdf(client, cache):
+    response = client.post("/api/send-book",
+                           files={"file": ("book.pdf", b"not a pdf", "application/octet-stream")})
+    assert response.status_code == 400
+    assert not list(cache.root.rglob("*"))
+
+
+def test_full_body_and_caching_headers(client, doc_id):
+    response = client.get(url(doc_id))
+    assert response.status_code == 200
+    assert response.headers["content-type"] == "image/jpeg"
+    assert previews.RENDER_VERSION in response.headers["etag"]
+    # Unversioned URLs must be revalidated...
+    assert "immutable" not in response.headers["cache-control"]
+    # ...while the versioned URL from the status endpoint is immutable.
+    version = client.get(f"/api/previews/{doc_id}").json()["version"]
+    response = client.get(url(doc_id) + f"&v={version}")
+    assert "immutable" in response.headers["cache-control"]
+    response = client.get(url(doc_id) + "&v=stale")
+    assert "immutable" not in response.headers["cache-control"]
+
+
+def test_render_failure_is_503(client, doc_id, monkeypatch):
+    def missing_pdftoppm(pdf_path, page, width):
+        raise FileNotFoundError("pdftoppm")
+
+    monkeypatch.setattr(previews, "_render_page", missing_pdftoppm)
+    assert client.get(url(doc_id, 2)).status_code == 503
+
+
+def test_if_none_match(client, doc_id):
+    etag = client.get(url(doc_id)).headers["etag"]
+    for header in (etag, f'"other", W/{etag}', "*"):
+        response = client.get(url(doc_id), headers={"If-None-Match": header})
+        assert response.status_code == 304
+    assert client.get(url(doc_id), headers={"If-None-Match": '"other"'}).status_code == 200
+
+
+def test_byte_ranges(client, doc_id):
+    body = client.get(url(doc_id)).content
+    size = len(body)
+
+    response = client.get(url(doc_id), headers={"Range": "bytes=0-9"})
+    assert response.status_code == 206
+    assert response.content == body[:10]
+    assert response.headers["content-range"] == f"bytes 0-9/{size}"
+
+    response = client.get(url(doc_id), headers={"Range": "bytes=-5"})
+    assert response.status_code == 206
+    assert response.content == body[-5:]
+
+    response = client.get(url(doc_id), headers={"Range": "bytes=10-"})
+    assert response.content == body[10:]
+
+    response = client.get(url(doc_id), headers={"Range": f"bytes={size}-"})
+    assert response.status_code == 416
+    assert response.headers["content-range"] == f"bytes */{size}"
+
+
+def test_unsupported_ranges_are_ignored(client, doc_id):
+    body = client.get(url(doc_id)).content
+    for header in ("bytes=0-1,5-6", "bytes=9-3", "items=0-1"):
+        response = client.get(url(doc_id), headers={"Range": header})
+        assert response.status_code == 200
+        assert response.content == body